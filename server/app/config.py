@@ -1,15 +1,14 @@
 
 import asyncio
 import concurrent.futures
+import hashlib
+import json
+import os
 import platform
-import psutil
 import re
-import requests
-import ruamel.yaml
-import subprocess
 import sys
+import time
 from pydantic import (
-    AnyHttpUrl,
     BaseModel,
     confloat,
     DirectoryPath,
@@ -19,13 +18,14 @@ from pydantic import (
     ValidationError,
     validator,
 )
-from pydantic.networks import stricturl
 from pathlib import Path
-from typing import Any, cast, Literal
+from typing import Any, Callable, cast, Literal
+from urllib.parse import urlparse
 
 from app.constants import (
     API_REQUEST_HEADERS,
     BASE_DIR,
+    CACHE_DIR,
     LIBRARY_PATH,
 )
 
@@ -74,13 +74,151 @@ class ClientSettings(BaseModel):
     tweet_capture_watermark_position: Literal['None', 'TopLeft', 'TopRight', 'BottomLeft', 'BottomRight'] = Field('None')
 
 
+# サーバーが稼働している CPU アーキテクチャ
+## プロセスの実行中に変わることはないため、起動時に一度だけ取得する
+_CURRENT_ARCH = platform.machine()
+
+# バックエンドの接続確認などを実行する ThreadPoolExecutor
+## 接続確認のたびにスレッドを生成・破棄しないよう、プロセス内で使い回す
+_PROBE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(1)
+
+# Mirakurun の接続確認に成功した URL と、その時刻 (time.monotonic()) ・Mirakurun のバージョンのキャッシュ
+## キャッシュの有効期限は 60 秒
+_MIRAKURUN_PROBE_CACHE: dict[str, tuple[float, str]] = {}
+_MIRAKURUN_PROBE_CACHE_TTL = 60
+
+
+def _GetLinuxListenPorts() -> set[int] | None:
+    """
+    Linux で /proc/net/tcp・/proc/net/tcp6 を直接読み取り、リッスン中の TCP ポートの一覧を取得する
+    接続を所有するプロセスの情報は取得できないが、psutil.net_connections() よりもはるかに高速に動作する
+
+    Returns:
+        set[int] | None: リッスン中のポート番号の集合 (/proc/net/tcp・/proc/net/tcp6 のどちらも読み取れなかった場合は None)
+    """
+
+    listen_ports: set[int] = set()
+    is_read = False
+    for proc_net_path in ['/proc/net/tcp', '/proc/net/tcp6']:
+        try:
+            with open(proc_net_path, encoding='ascii') as file:
+                lines = file.readlines()
+        except OSError:
+            continue
+        is_read = True
+        # 1行目はヘッダーなので飛ばす
+        ## 2列目がローカルアドレス (16進数の IP アドレス:ポート番号) 、4列目が接続状態 (0A が LISTEN) を表す
+        for line in lines[1:]:
+            columns = line.split()
+            if len(columns) >= 4 and columns[3] == '0A':
+                listen_ports.add(int(columns[1].rsplit(':', 1)[1], 16))
+
+    return listen_ports if is_read is True else None
+
+
+def _WriteCacheFile(path: Path, data: Any) -> bool:
+    """
+    データを JSON にシリアライズし、キャッシュファイルに書き込む
+    複数のプロセスから同時に書き込まれても壊れないよう、一時ファイルに書き込んでから os.replace() でアトミックに置き換える
+
+    Args:
+        path (Path): 書き込むキャッシュファイルのパス
+        data (Any): 書き込むデータ
+
+    Returns:
+        bool: キャッシュファイルへの書き込みに成功したかどうか
+    """
+
+    # キャッシュの書き込みに失敗しても起動には影響しないため、エラーは無視する
+    try:
+        cache_json = json.dumps(data, ensure_ascii=False)
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(temp_path, mode='w', encoding='utf-8') as file:
+            file.write(cache_json)
+        os.replace(temp_path, path)
+    except (OSError, TypeError, ValueError):
+        return False
+
+    return True
+
+
+# エンコーダーの実行結果のキャッシュファイルのパス
+_ENCODER_PROBE_CACHE_PATH = CACHE_DIR / 'encoder_probe.json'
+
+
+# エンコーダーのバージョン情報から、Copyright (FFmpeg) と by rigaya (HWEncC) 以降の文字列を削除するための正規表現
+_ENCODER_VERSION_SCRUB_PATTERN = re.compile(r' (?:Copyright|by rigaya).*$')
+
+
+def _RunEncoderProbe(encoder: str, option: str, merge_stderr: bool = False) -> str:
+    """
+    エンコーダーをオプション付きで実行し、標準出力を文字列として返す
+    実行結果はエンコーダーの実行ファイルの更新日時・サイズをキーにキャッシュしておき、
+    エンコーダーが変更されておらず、OS も再起動されていない場合はエンコーダーを実行せずにキャッシュから返す
+    (自動リロードモードではバリデーションのたびにエンコーダーが実行されることになり、起動が遅くなるため)
+
+    Args:
+        encoder (str): 実行するエンコーダーの名前 (LIBRARY_PATH のキー)
+        option (str): エンコーダーに渡すオプション
+        merge_stderr (bool): 標準エラー出力も標準出力に含めるかどうか
+
+    Returns:
+        str: エンコーダーの標準出力
+    """
+
+    # 遅延インポート
+    import psutil
+    import subprocess
+
+    # キャッシュファイルに保存されている実行結果のシグネチャが一致し、OS も再起動されていなければ、キャッシュの内容を返す
+    ## ハードウェアエンコーダーの利用可否はドライバーやハードウェアの構成によって変わり、これらは基本的に OS の再起動を伴って変わるため、
+    ## キャッシュを保存した時点の OS の起動時刻も併せて比較する
+    ## Windows の psutil.boot_time() はプロセス間で 1 秒程度ずれることがあるため、完全一致ではなく 5 秒の誤差を許容する
+    cache_key = f'{encoder} {option}'
+    boot_time = psutil.boot_time()
+    try:
+        stat = os.stat(LIBRARY_PATH[encoder])
+        signature = [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        signature = None  # 実行ファイルが存在しない場合はキャッシュを使わない
+    cache: dict[str, Any] = {}
+    try:
+        with open(_ENCODER_PROBE_CACHE_PATH, encoding='utf-8') as file:
+            cache = json.load(file)
+        if (signature is not None and cache[cache_key]['signature'] == signature and
+            abs(cache[cache_key]['boot_time'] - boot_time) < 5):
+            return cache[cache_key]['stdout']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    # エンコーダーを実行する
+    result = subprocess.run(
+        [LIBRARY_PATH[encoder], option],
+        stdout = subprocess.PIPE,
+        stderr = (subprocess.STDOUT if merge_stderr is True else subprocess.DEVNULL),
+    )
+    result_stdout = result.stdout.decode('utf-8', 'replace')
+
+    # 実行結果をキャッシュファイルに書き込む
+    ## エンコーダーの実行に失敗した場合や、ハードウェアエンコーダーが利用できないと判定された場合はキャッシュしない
+    ## (ドライバーのインストールやデバイスの権限の修正などで利用可能になった際に、古い結果が使われ続けてしまうため)
+    if signature is not None and result.returncode == 0 and 'unavailable.' not in result_stdout:
+        if type(cache) is not dict:
+            cache = {}
+        cache[cache_key] = {'signature': signature, 'boot_time': boot_time, 'stdout': result_stdout}
+        _WriteCacheFile(_ENCODER_PROBE_CACHE_PATH, cache)
+
+    return result_stdout
+
+
 # サーバー設定を表す Pydantic モデル
 # config.yaml のバリデーションは設定データをこの Pydantic モデルに通すことで行う
 
 class _ServerSettingsGeneral(BaseModel):
     backend: Literal['EDCB', 'Mirakurun']
-    edcb_url: stricturl(allowed_schemes={'tcp'}, tld_required=False)  # type: ignore
-    mirakurun_url: AnyHttpUrl
+    edcb_url: str
+    mirakurun_url: str
     encoder: Literal['FFmpeg', 'QSVEncC', 'NVEncC', 'VCEEncC', 'rkmppenc']
     program_update_interval: confloat(ge=0.1)  # type: ignore
     debug: bool
@@ -88,10 +226,24 @@ class _ServerSettingsGeneral(BaseModel):
 
     @validator('edcb_url')
     def validate_edcb_url(cls, edcb_url: str, values: dict[str, Any]) -> str:
-        # EDCB バックエンドの接続確認
+        # URL の形式をチェック
+        ## Pydantic の URL 型は汎用的な URL の正規表現でバリデーションを行うため重く、ここではスキームとホスト名さえ分かればよい
+        ## ポート番号が数値でない (または範囲外の) 場合は parsed_url.port の参照時に ValueError が発生する
+        parsed_url = urlparse(edcb_url)
+        try:
+            parsed_url.port
+            is_valid_url = parsed_url.scheme == 'tcp' and bool(parsed_url.hostname)
+        except ValueError:
+            is_valid_url = False
+        if is_valid_url is False:
+            raise ValueError(
+                f'EDCB の URL ({edcb_url}) の形式が不正です。\n'
+                'EDCB の URL は tcp://(ホスト名):(ポート番号)/ の形式で指定してください。'
+            )
+        # EDCB バックエンドの URL のチェック
+        ## 実際に EDCB に接続できるかの確認は、バリデーション後に ProbeServerSettings() で行う
         if values.get('backend') == 'EDCB':
             # 循環参照を避けるために遅延インポート
-            from app.utils.EDCB import CtrlCmdUtil
             from app.utils.EDCB import EDCBUtil
             # edcb_url を明示的に指定
             ## edcb_url を省略すると内部で再帰的に LoadConfig() が呼ばれてしまい RecursionError が発生する
@@ -103,98 +255,41 @@ class _ServerSettingsGeneral(BaseModel):
                     'URL 内にホスト名またはポートが指定されていません。\n'
                     'EDCB の URL を間違えている可能性があります。'
                 )
-            # サービス一覧が取得できるか試してみる
-            ## RecursionError 回避のために edcb_url を明示的に指定
-            ## ThreadPoolExecutor 上で実行し、自動リロードモード時に発生するイベントループ周りの謎エラーを回避する
-            edcb = CtrlCmdUtil(edcb_url)
-            edcb.setConnectTimeOutSec(5)  # 5秒後にタイムアウト
-            with concurrent.futures.ThreadPoolExecutor(1) as executor:
-                result = executor.submit(asyncio.run, edcb.sendEnumService()).result()
-            if result is None:
-                raise ValueError(
-                    f'EDCB ({edcb_url}/) にアクセスできませんでした。\n'
-                    'EDCB が起動していないか、URL を間違えている可能性があります。'
-                )
-            from app.utils import Logging
-            Logging.info(f'Backend: EDCB ({edcb_url}/)')
         return edcb_url
 
     @validator('mirakurun_url')
     def validate_mirakurun_url(cls, mirakurun_url: str, values: dict[str, Any]) -> str:
-        # Mirakurun バックエンドの接続確認
-        if values.get('backend') == 'Mirakurun':
-            # 試しにリクエストを送り、200 (OK) が返ってきたときだけ有効な URL とみなす
-            try:
-                response = requests.get(
-                    url = f'{mirakurun_url}/api/version',
-                    headers = API_REQUEST_HEADERS,
-                    timeout = 20,  # 久々のアクセスだとなぜか時間がかかることがあるため、ここだけタイムアウトを長めに設定
-                )
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-                raise ValueError(
-                    f'Mirakurun ({mirakurun_url}/) にアクセスできませんでした。\n'
-                    'Mirakurun が起動していないか、URL を間違えている可能性があります。'
-                )
-            try:
-                response_json = response.json()
-                if response.status_code != 200 or response_json.get('current') is None:
-                    raise requests.exceptions.JSONDecodeError()
-            except requests.exceptions.JSONDecodeError:
-                raise ValueError(
-                    f'{mirakurun_url}/ は Mirakurun の URL ではありません。\n'
-                    'Mirakurun の URL を間違えている可能性があります。'
-                )
-            from app.utils import Logging
-            Logging.info(f'Backend: Mirakurun {response_json.get("current")} ({mirakurun_url}/)')
+        # URL の形式をチェック
+        ## ポート番号が数値でない (または範囲外の) 場合は parsed_url.port の参照時に ValueError が発生する
+        parsed_url = urlparse(mirakurun_url)
+        try:
+            parsed_url.port
+            is_valid_url = parsed_url.scheme in ('http', 'https') and bool(parsed_url.hostname)
+        except ValueError:
+            is_valid_url = False
+        if is_valid_url is False:
+            raise ValueError(
+                f'Mirakurun の URL ({mirakurun_url}) の形式が不正です。\n'
+                'Mirakurun の URL は http://(ホスト名):(ポート番号)/ の形式で指定してください。'
+            )
+        # 実際に Mirakurun に接続できるかの確認は、バリデーション後に ProbeServerSettings() で行う
         return mirakurun_url
 
     @validator('encoder')
     def validate_encoder(cls, encoder: str) -> str:
-        from app.utils import Logging
-        current_arch = platform.machine()
+        # 実際にエンコーダーが利用できるかの確認は、バリデーション後に ProbeServerSettings() で行う
         # x64 なのにエンコーダーとして rkmppenc が指定されている場合
-        if current_arch in ['AMD64', 'x86_64'] and encoder == 'rkmppenc':
+        if _CURRENT_ARCH in ['AMD64', 'x86_64'] and encoder == 'rkmppenc':
             raise ValueError(
                 'x64 アーキテクチャでは rkmppenc は使用できません。\n'
                 '利用するエンコーダーを FFmpeg・QSVEncC・NVEncC・VCEEncC のいずれかに変更してください。'
             )
         # arm64 なのにエンコーダーとして QSVEncC・NVEncC・VCEEncC が指定されている場合
-        if current_arch == 'aarch64' and encoder in ['QSVEncC', 'NVEncC', 'VCEEncC']:
+        if _CURRENT_ARCH == 'aarch64' and encoder in ['QSVEncC', 'NVEncC', 'VCEEncC']:
             raise ValueError(
                 'arm64 アーキテクチャでは QSVEncC・NVEncC・VCEEncC は使用できません。\n'
                 '利用するエンコーダーを FFmpeg・rkmppenc のいずれかに変更してください。'
             )
-        # HWEncC が指定されているときのみ、--check-hw でハードウェアエンコーダーが利用できるかをチェック
-        ## もし利用可能なら標準出力に "H.264/AVC" という文字列が出力されるので、それで判定する
-        if encoder != 'FFmpeg':
-            result = subprocess.run(
-                [LIBRARY_PATH[encoder], '--check-hw'],
-                stdout = subprocess.PIPE,
-                stderr = subprocess.DEVNULL,
-            )
-            result_stdout = result.stdout.decode('utf-8')
-            result_stdout = '\n'.join([line for line in result_stdout.split('\n') if 'reader:' not in line])
-            if 'unavailable.' in result_stdout:
-                raise ValueError(
-                    f'お使いの環境では {encoder} がサポートされていないため、KonomiTV を起動できません。\n'
-                    f'別のエンコーダーを選択するか、{encoder} の動作環境を整備してください。'
-                )
-            # H.265/HEVC に対応していない環境では、通信節約モードが利用できない旨を出力する
-            if 'H.265/HEVC' not in result_stdout:
-                Logging.warning(f'お使いの環境では {encoder} での H.265/HEVC エンコードがサポートされていないため、通信節約モードは利用できません。')
-        # エンコーダーのバージョン情報を取得する
-        ## バージョン情報は出力の1行目にある
-        result = subprocess.run(
-            [LIBRARY_PATH[encoder], '--version'],
-            stdout = subprocess.PIPE,
-            stderr = subprocess.STDOUT,
-        )
-        encoder_version = result.stdout.decode('utf-8').split('\n')[0]
-        ## Copyright (FFmpeg) と by rigaya (HWEncC) 以降の文字列を削除
-        encoder_version = re.sub(r' Copyright.*$', '', encoder_version)
-        encoder_version = re.sub(r' by rigaya.*$', '', encoder_version)
-        encoder_version = encoder_version.replace('ffmpeg', 'FFmpeg').strip()
-        Logging.info(f'Encoder: {encoder_version}')
         return encoder
 
 class _ServerSettingsServer(BaseModel):
@@ -210,27 +305,44 @@ class _ServerSettingsServer(BaseModel):
                 'ポート番号の設定が不正なため、KonomiTV を起動できません。\n'
                 '設定したポート番号が 1024 ~ 65525 (65535 ではない) の間に収まっているかを確認してください。'
             )
+        # チェックが必要なのはリッスンポート (port) と Akebi のリッスンポート (port + 10) だけなので、それ以外のポートは無視する
+        check_ports = {port, port + 10}
+        # Linux では /proc/net/tcp からリッスン中のポートを直接取得し、チェック対象のポートがどちらもリッスンされていなければ、
+        # psutil での重い接続一覧の取得 (すべてのプロセスのファイルディスクリプタを走査する) を省略する
+        if sys.platform == 'linux':
+            listen_ports = _GetLinuxListenPorts()
+            if listen_ports is not None and check_ports.isdisjoint(listen_ports):
+                return port
         # 使用中のポートを取得
         # ref: https://qiita.com/skokado/items/6e76762c68866d73570b
+        ## psutil はインポートに時間がかかるため遅延インポート
+        import psutil
+        ## 接続を所有するプロセスの情報の取得は重いため、チェック対象のポートでリッスンしている接続に対してのみ行う
         current_process = psutil.Process()
-        used_ports: list[int] = []
-        for conn in psutil.net_connections():
-            if conn.status == 'LISTEN':
-                if conn.pid is None:
-                    continue
-                # 自分自身のプロセスは除外
-                ## サーバーの起動中に再度バリデーションが実行された際に、ポートが使用中と判定されてしまうのを防ぐためのもの
-                ## 自動リロードモードでの reloader process や Akebi は KonomiTV サーバーの子プロセスになるので、
-                ## プロセスの親プロセスの PID が一致するかもチェックする
-                process = psutil.Process(conn.pid)
-                if ((process.pid == current_process.pid) or
-                    (process.pid == current_process.ppid()) or
-                    (process.ppid() == current_process.pid) or
-                    (process.ppid() == current_process.ppid())):
+        current_pids = {current_process.pid, current_process.ppid()}
+        used_ports: set[int] = set()
+        for conn in psutil.net_connections(kind='inet'):
+            if conn.status != psutil.CONN_LISTEN or conn.pid is None or not conn.laddr:
+                continue
+            conn_port: int = cast(Any, conn.laddr).port
+            if conn_port not in check_ports or conn_port in used_ports:
+                continue
+            # 自分自身のプロセスは除外
+            ## サーバーの起動中に再度バリデーションが実行された際に、ポートが使用中と判定されてしまうのを防ぐためのもの
+            ## 自動リロードモードでの reloader process や Akebi は KonomiTV サーバーの子プロセスになるので、
+            ## プロセスの親プロセスの PID が一致するかもチェックする
+            if conn.pid in current_pids:
+                continue
+            try:
+                if psutil.Process(conn.pid).ppid() in current_pids:
                     continue
-                # 使用中のポートに追加
-                if conn.laddr is not None:
-                    used_ports.append(cast(Any, conn.laddr).port)
+            except psutil.NoSuchProcess:
+                continue  # 既に終了したプロセスの接続は無視する
+            # 使用中のポートに追加
+            used_ports.add(conn_port)
+            # チェック対象のポートがすべて使用中だと判明した時点で打ち切る
+            if used_ports == check_ports:
+                break
         # リッスンポートと同じポートが使われていたら、エラーを表示する
         # Akebi HTTPS Server のリッスンポートと Uvicorn のリッスンポートの両方をチェック
         if port in used_ports:
@@ -245,14 +357,23 @@ class _ServerSettingsServer(BaseModel):
             )
         return port
 
-class _ServerSettingsTV(BaseModel):
+# 起動後に変更されることのないサーバー設定のセクションの基底クラス
+class _ServerSettingsImmutable(BaseModel):
+    class Config:
+        # インスタンスの変更を禁止する
+        allow_mutation = False
+        # 親モデルのバリデーション時に、既存のインスタンスがコピーされないようにする
+        ## デフォルトでは親モデルに渡されたインスタンスが毎回コピーされるが、変更されることがないためコピーは不要
+        copy_on_model_validation = 'none'
+
+class _ServerSettingsTV(_ServerSettingsImmutable):
     max_alive_time: PositiveInt
     debug_mode_ts_path: FilePath | None
 
-class _ServerSettingsCapture(BaseModel):
+class _ServerSettingsCapture(_ServerSettingsImmutable):
     upload_folder: DirectoryPath
 
-class _ServerSettingsTwitter(BaseModel):
+class _ServerSettingsTwitter(_ServerSettingsImmutable):
     consumer_key: str | None
     consumer_secret: str | None
 
@@ -279,6 +400,159 @@ class ServerSettings(BaseModel):
         )
 
 
+# サーバー設定に記述されたバックエンドやエンコーダーが実際に利用できるかを確認する関数
+# Pydantic のバリデーターは同期的に1つずつ実行されるため、時間のかかる確認処理はバリデーション後にまとめて並列に実行する
+
+async def ProbeEDCB(edcb_url: str) -> None:
+    """
+    EDCB バックエンドに接続できるかを確認する
+
+    Args:
+        edcb_url (str): EDCB の URL
+
+    Raises:
+        ValueError: EDCB にアクセスできなかった場合
+    """
+
+    # 循環参照を避けるために遅延インポート
+    from app.utils import Logging
+    from app.utils.EDCB import CtrlCmdUtil
+
+    # サービス一覧が取得できるか試してみる
+    ## RecursionError 回避のために edcb_url を明示的に指定
+    edcb = CtrlCmdUtil(edcb_url)
+    edcb.setConnectTimeOutSec(5)  # 5秒後にタイムアウト
+    result = await edcb.sendEnumService()
+    if result is None:
+        raise ValueError(
+            f'EDCB ({edcb_url}/) にアクセスできませんでした。\n'
+            'EDCB が起動していないか、URL を間違えている可能性があります。'
+        )
+    Logging.info(f'Backend: EDCB ({edcb_url}/)')
+
+
+async def ProbeMirakurun(mirakurun_url: str) -> None:
+    """
+    Mirakurun バックエンドに接続できるかを確認する
+
+    Args:
+        mirakurun_url (str): Mirakurun の URL
+
+    Raises:
+        ValueError: Mirakurun にアクセスできなかった場合
+    """
+
+    # 循環参照を避けるために遅延インポート
+    from app.utils import Logging
+
+    # 直近で接続確認に成功した URL であれば、接続確認を省略する
+    ## サーバー設定更新 API などで確認が繰り返し実行されたときに、毎回 HTTP リクエストを送らないようにする
+    probe_cache = _MIRAKURUN_PROBE_CACHE.get(mirakurun_url)
+    if probe_cache is not None and time.monotonic() - probe_cache[0] < _MIRAKURUN_PROBE_CACHE_TTL:
+        Logging.info(f'Backend: Mirakurun {probe_cache[1]} ({mirakurun_url}/)')
+        return
+
+    # requests はインポートに時間がかかるため、標準ライブラリの urllib.request を使う
+    import http.client
+    import urllib.error
+    import urllib.request
+
+    # 試しにリクエストを送り、200 (OK) が返ってきたときだけ有効な URL とみなす
+    ## イベントループをブロックしないよう、別スレッドでリクエストを送る
+    def RequestVersion() -> tuple[int, bytes]:
+        request = urllib.request.Request(f'{mirakurun_url}/api/version', headers=API_REQUEST_HEADERS)
+        # 久々のアクセスだとなぜか時間がかかることがあるため、ここだけタイムアウトを長めに設定
+        with urllib.request.urlopen(request, timeout=20) as response:
+            return response.status, response.read()
+    try:
+        response_status, response_body = await asyncio.to_thread(RequestVersion)
+    except urllib.error.HTTPError as error:
+        response_status, response_body = error.code, b''
+    except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError):
+        raise ValueError(
+            f'Mirakurun ({mirakurun_url}/) にアクセスできませんでした。\n'
+            'Mirakurun が起動していないか、URL を間違えている可能性があります。'
+        )
+    try:
+        response_json = json.loads(response_body)
+        if response_status != 200 or type(response_json) is not dict or response_json.get('current') is None:
+            raise ValueError()
+    except ValueError:
+        raise ValueError(
+            f'{mirakurun_url}/ は Mirakurun の URL ではありません。\n'
+            'Mirakurun の URL を間違えている可能性があります。'
+        )
+    mirakurun_version = cast(str, response_json['current'])
+    _MIRAKURUN_PROBE_CACHE[mirakurun_url] = (time.monotonic(), mirakurun_version)
+    Logging.info(f'Backend: Mirakurun {mirakurun_version} ({mirakurun_url}/)')
+
+
+async def ProbeEncoder(encoder: str) -> None:
+    """
+    エンコーダーが利用できるかを確認し、エンコーダーのバージョン情報を出力する
+
+    Args:
+        encoder (str): エンコーダーの名前
+
+    Raises:
+        ValueError: エンコーダーが利用できない場合
+    """
+
+    # 循環参照を避けるために遅延インポート
+    from app.utils import Logging
+
+    # HWEncC が指定されているときのみ、--check-hw でハードウェアエンコーダーが利用できるかをチェック
+    ## もし利用可能なら標準出力に "H.264/AVC" という文字列が出力されるので、それで判定する
+    ## イベントループをブロックしないよう、エンコーダーは別スレッドで実行する
+    if encoder != 'FFmpeg':
+        result_stdout = await asyncio.to_thread(_RunEncoderProbe, encoder, '--check-hw')
+        result_stdout = '\n'.join([line for line in result_stdout.split('\n') if 'reader:' not in line])
+        if 'unavailable.' in result_stdout:
+            raise ValueError(
+                f'お使いの環境では {encoder} がサポートされていないため、KonomiTV を起動できません。\n'
+                f'別のエンコーダーを選択するか、{encoder} の動作環境を整備してください。'
+            )
+        # H.265/HEVC に対応していない環境では、通信節約モードが利用できない旨を出力する
+        if 'H.265/HEVC' not in result_stdout:
+            Logging.warning(f'お使いの環境では {encoder} での H.265/HEVC エンコードがサポートされていないため、通信節約モードは利用できません。')
+
+    # エンコーダーのバージョン情報を取得する
+    ## バージョン情報は出力の1行目にある
+    encoder_version = (await asyncio.to_thread(_RunEncoderProbe, encoder, '--version', merge_stderr=True)).split('\n', 1)[0]
+    ## Copyright (FFmpeg) と by rigaya (HWEncC) 以降の文字列を削除
+    encoder_version = _ENCODER_VERSION_SCRUB_PATTERN.sub('', encoder_version)
+    encoder_version = encoder_version.replace('ffmpeg', 'FFmpeg').strip()
+    Logging.info(f'Encoder: {encoder_version}')
+
+
+async def ProbeServerSettings(config: ServerSettings) -> list[str]:
+    """
+    サーバー設定に記述されたバックエンドへの接続確認と、エンコーダーの動作確認を並列に実行する
+    バリデーション済みのサーバー設定データに対して実行すること
+
+    Args:
+        config (ServerSettings): バリデーション済みのサーバー設定データ
+
+    Returns:
+        list[str]: 確認に失敗した項目のエラーメッセージのリスト (すべての確認に成功した場合は空のリスト)
+    """
+
+    probes = [ProbeEncoder(config.general.encoder)]
+    if config.general.backend == 'EDCB':
+        probes.append(ProbeEDCB(config.general.edcb_url))
+    elif config.general.backend == 'Mirakurun':
+        probes.append(ProbeMirakurun(config.general.mirakurun_url))
+
+    # ValueError 以外の例外は想定外のエラーなので、そのまま送出する
+    error_messages: list[str] = []
+    for result in await asyncio.gather(*probes, return_exceptions=True):
+        if isinstance(result, ValueError):
+            error_messages.append(str(result))
+        elif isinstance(result, BaseException):
+            raise result
+    return error_messages
+
+
 # サーバー設定データと読み込み・保存用の関数
 # _CONFIG には config.yaml から読み込んだ KonomiTV サーバーの設定データが保持される
 # _CONFIG には直接アクセスせず、Config() 関数を通してアクセスする
@@ -287,6 +561,100 @@ _CONFIG: ServerSettings | None = None
 _CONFIG_YAML_PATH = BASE_DIR.parent / 'config.yaml'
 _DOCKER_PATH_PREFIX = '/host-rootfs'
 
+# config.yaml の読み込みに使う YAML パーサー
+## 読み込み時はコメントやフォーマットを保持する必要がないため、ラウンドトリップモードではなく safe モードを使う
+## safe モードでは libyaml ベースの C 実装のパーサー (ruamel.yaml.clib) が使われ、パース結果も素の dict になる
+## ruamel.yaml.clib が利用できない環境では、ruamel.yaml が自動的に Pure Python 実装のパーサーにフォールバックする
+## キャッシュが有効なときは ruamel.yaml 自体をインポートせずに済むよう、初めてパースが必要になった時点で生成する
+_FAST_YAML: Any = None
+
+
+# SaveConfig() と GetServerPort() で config.yaml の各行をマッチさせる正規表現
+## 1行ごとにマッチを行うため、事前にコンパイルしておく
+_PARENT_KEY_PATTERN = re.compile(r'^ {4}(?P<key>\'.*?\'|\".*?\"): \{$')
+_LIST_START_PATTERN = re.compile(r'^ {8}(?P<key>\'.*?\'|\".*?\"): \[\s*(#.*)?$')
+_LIST_END_PATTERN = re.compile(r'^ {8}\],\s*(#.*)?$')
+_KEY_VALUE_PATTERN = re.compile(r'^ {8}(?P<key>\'.*?\'|\".*?\"): (?P<value>[0-9\.]+|true|false|null|\'.*?\'|\".*?\"),$')
+_PORT_PATTERN = re.compile(r'^\s*[\'"]?port[\'"]?\s*:\s*(?P<port>\d+)')
+## マッチしたキーからクォートを取り除くための変換テーブル
+_QUOTE_STRIP_TABLE = str.maketrans('', '', '"\'')
+
+def _FormatYAMLString(value: Any) -> str:
+    """
+    SaveConfig() で config.yaml に書き込む値を、シングルクォートで囲んだ YAML の文字列の表記に変換する
+    _YAML_VALUE_FORMATTERS にない型 (str や Path など) の値に使われる
+
+    Args:
+        value (Any): 変換する値
+
+    Returns:
+        str: シングルクォートで囲み、バックスラッシュをエスケープした文字列
+    """
+
+    return f"'{value}'".replace('\\', '\\\\')
+
+
+# SaveConfig() で config.yaml に書き込む値を、値の型ごとに YAML の表記に変換する関数
+## bool は int のサブクラスだが、type(value) の完全一致で引くため bool 用の関数が使われる
+## float は 15.0 のような値を 15 と表記する
+## 辞書にない型 (str や Path など) は _FormatYAMLString() で変換する
+_YAML_VALUE_FORMATTERS: dict[type, Callable[[Any], str]] = {
+    bool: lambda value: 'true' if value is True else 'false',
+    int: str,
+    float: lambda value: str(value).removesuffix('.0'),
+    type(None): lambda value: 'null',
+}
+
+
+def _LoadConfigYAML() -> Any:
+    """
+    config.yaml をロードし、パースした結果を返す
+    YAML のパースは重いため、パース結果を JSON 形式のキャッシュファイルとして保存しておき、
+    config.yaml が変更されていない場合はキャッシュファイルから読み込む
+    キャッシュファイルは config.yaml の更新日時をファイル名に含み、さらに中身に config.yaml のサイズと先頭 4KiB のハッシュを保持している
+    (更新日時が信頼できない環境でも、内容が変わっていればキャッシュは使われない)
+
+    Returns:
+        Any: config.yaml をパースした結果
+    """
+
+    # config.yaml の更新日時・サイズ・先頭 4KiB のハッシュから、キャッシュのバージョンを算出する
+    stat = os.stat(_CONFIG_YAML_PATH)
+    with open(_CONFIG_YAML_PATH, mode='rb') as file:
+        head_hash = hashlib.blake2b(file.read(4096), digest_size=16).hexdigest()
+    cache_version = f'{stat.st_size}-{head_hash}'
+    cache_path = CACHE_DIR / f'{_CONFIG_YAML_PATH.name}.{stat.st_mtime_ns}.json'
+
+    # キャッシュファイルが存在し、バージョンが一致するならキャッシュの内容を返す
+    try:
+        with open(cache_path, encoding='utf-8') as file:
+            cache = json.load(file)
+        if cache.get('version') == cache_version:
+            return cache['config']
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass  # キャッシュが存在しないか壊れている場合は config.yaml をパースする
+
+    # config.yaml をパースする
+    global _FAST_YAML
+    if _FAST_YAML is None:
+        import ruamel.yaml
+        _FAST_YAML = ruamel.yaml.YAML(typ='safe')
+    with open(_CONFIG_YAML_PATH, encoding='utf-8') as file:
+        config_raw = _FAST_YAML.load(file)
+
+    # パース結果をキャッシュファイルに書き込む
+    if _WriteCacheFile(cache_path, {'version': cache_version, 'config': config_raw}) is True:
+        # 古い config.yaml のキャッシュファイルを削除する
+        ## 削除に失敗しても起動には影響しないため、エラーは無視する
+        try:
+            for old_cache_path in CACHE_DIR.glob(f'{_CONFIG_YAML_PATH.name}.*.json'):
+                if old_cache_path != cache_path:
+                    old_cache_path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    return config_raw
+
 
 def LoadConfig(bypass_validation: bool = False) -> ServerSettings:
     """
@@ -319,12 +687,11 @@ def LoadConfig(bypass_validation: bool = False) -> ServerSettings:
 
     # 設定ファイルからサーバー設定をロードする
     try:
-        with open(_CONFIG_YAML_PATH, encoding='utf-8') as file:
-            config_raw = ruamel.yaml.YAML().load(file)
-            if config_raw is None:
-                Logging.error('設定ファイルが空のため、KonomiTV を起動できません。')
-                Logging.error('config.example.yaml を config.yaml にコピーし、お使いの環境に合わせて編集してください。')
-                sys.exit(1)
+        config_raw = _LoadConfigYAML()
+        if config_raw is None:
+            Logging.error('設定ファイルが空のため、KonomiTV を起動できません。')
+            Logging.error('config.example.yaml を config.yaml にコピーし、お使いの環境に合わせて編集してください。')
+            sys.exit(1)
         config_dict: dict[str, dict[str, Any]] = dict(config_raw)
     except Exception as error:
         Logging.error('設定ファイルのロード中にエラーが発生したため、KonomiTV を起動できません。')
@@ -350,8 +717,7 @@ def LoadConfig(bypass_validation: bool = False) -> ServerSettings:
     # サーバー設定のバリデーションを実行
     if bypass_validation is False:
         try:
-            _CONFIG = ServerSettings(**cast(Any, config_dict))
-            Logging.debug_simple('Server settings loaded.')
+            config = ServerSettings(**cast(Any, config_dict))
         except ValidationError as error:
 
             # エラーのうちどれか一つでもカスタムバリデーターからのエラーだった場合
@@ -370,6 +736,18 @@ def LoadConfig(bypass_validation: bool = False) -> ServerSettings:
             Logging.error('以下のエラーメッセージを参考に、config.yaml の記述が正しいかを確認してください。')
             Logging.error(error)
             sys.exit(1)
+
+        # バックエンドへの接続確認とエンコーダーの動作確認を並列に実行
+        ## ThreadPoolExecutor 上で実行し、自動リロードモード時に発生するイベントループ周りの謎エラーを回避する
+        error_messages = _PROBE_EXECUTOR.submit(asyncio.run, ProbeServerSettings(config)).result()
+        if len(error_messages) > 0:
+            for error_message in error_messages:
+                for message in error_message.split('\n'):
+                    Logging.error(message)
+            sys.exit(1)
+
+        _CONFIG = config
+        Logging.debug_simple('Server settings loaded.')
     else:
         _CONFIG = ServerSettings.unverified(config_dict)
         Logging.debug_simple('Server settings loaded (bypassed validation).')
@@ -409,40 +787,39 @@ def SaveConfig(config: ServerSettings) -> None:
         current_lines = file.readlines()
 
     # 新しく作成する config.yaml の内容が入るリスト
-    ## このリストに格納された値を、最後に文字列として繋げて書き込む
+    ## このリストに格納された値を、最後にまとめて書き込む
     new_lines: list[str] = []
 
     current_parent_key: str = ''
+    current_parent_dict: dict[str, Any] = {}
     in_list: bool = False
     list_key: str = ''
 
     for current_line in current_lines:
-        parent_key_match_pattern = r'^ {4}(?P<key>\'.*?\'|\".*?\"): \{$'
-        parent_key_match = re.match(parent_key_match_pattern, current_line)
+        parent_key_match = _PARENT_KEY_PATTERN.match(current_line)
 
         if parent_key_match is not None:
             parent_key_match_data = parent_key_match.groupdict()
-            current_parent_key = parent_key_match_data['key'].replace('"', '').replace('\'', '')
+            current_parent_key = parent_key_match_data['key'].translate(_QUOTE_STRIP_TABLE)
+            current_parent_dict = config_dict.get(current_parent_key, {})
             new_lines.append(current_line)
             continue
 
-        list_start_pattern = r'^ {8}(?P<key>\'.*?\'|\".*?\"): \[\s*(#.*)?$'
-        list_start_match = re.match(list_start_pattern, current_line)
+        list_start_match = _LIST_START_PATTERN.match(current_line)
 
         if list_start_match is not None:
             list_start_match_data = list_start_match.groupdict()
-            list_key = list_start_match_data['key'].replace('"', '').replace('\'', '')
+            list_key = list_start_match_data['key'].translate(_QUOTE_STRIP_TABLE)
             in_list = True
 
-            if list_key in config_dict[current_parent_key]:
-                new_list = ",\n".join([f"        '{item}'" for item in config_dict[current_parent_key][list_key]])
+            if list_key in current_parent_dict:
+                new_list = ",\n".join([f"        '{item}'" for item in current_parent_dict[list_key]])
                 new_lines.append(f"    '{list_key}': [\n{new_list}\n    ],\n")
             else:
                 new_lines.append(current_line)
             continue
 
-        list_end_pattern = r'^ {8}\],\s*(#.*)?$'
-        list_end_match = re.match(list_end_pattern, current_line)
+        list_end_match = _LIST_END_PATTERN.match(current_line)
 
         if list_end_match is not None:
             in_list = False
@@ -451,40 +828,32 @@ def SaveConfig(config: ServerSettings) -> None:
         if in_list:
             continue
 
-        key_value_match_pattern = r'^ {8}(?P<key>\'.*?\'|\".*?\"): (?P<value>[0-9\.]+|true|false|null|\'.*?\'|\".*?\"),$'
-        key_value_match = re.match(key_value_match_pattern, current_line)
+        key_value_match = _KEY_VALUE_PATTERN.match(current_line)
 
         if key_value_match is not None:
             key_value_match_data = key_value_match.groupdict()
-            key = key_value_match_data['key'].replace('"', '').replace('\'', '')
-
-            if key in config_dict[current_parent_key]:
-                value = config_dict[current_parent_key][key]
-
-                if type(value) is int or type(value) is float:
-                    value_real = str(value)
-                    if value_real.endswith('.0'):
-                        value_real = value_real[:-2]
-                elif value is True:
-                    value_real = 'true'
-                elif value is False:
-                    value_real = 'false'
-                elif value is None:
-                    value_real = 'null'
-                else:
-                    value_real = f"'{value}'"
-                value_real = value_real.replace('\\', '\\\\')
-
-                new_line = re.sub(key_value_match_pattern, r'        \g<key>: ' + value_real + ',', current_line)
+            key = key_value_match_data['key'].translate(_QUOTE_STRIP_TABLE)
+
+            if key in current_parent_dict:
+                value = current_parent_dict[key]
+
+                value_real = _YAML_VALUE_FORMATTERS.get(type(value), _FormatYAMLString)(value)
+
+                new_line = _KEY_VALUE_PATTERN.sub(r'        \g<key>: ' + value_real + ',', current_line)
                 new_lines.append(new_line)
                 continue
 
         new_lines.append(current_line)
 
+    # 設定内容が変わっていない場合は書き込まずに終了する
+    ## config.yaml の更新日時が変わると、起動時に使われるパース結果のキャッシュが無効になってしまうため
+    if new_lines == current_lines:
+        return
+
     # 置換が終わったので、config.yaml に書き込む
-    ## リスト内の各要素にはすでに改行コードが含まれているので、空文字で join() するだけで OK
+    ## リスト内の各要素にはすでに改行コードが含まれているので、そのまま順に書き込むだけで OK
     with open(_CONFIG_YAML_PATH, mode='w', encoding='utf-8') as file:
-        file.write(''.join(new_lines))
+        file.writelines(new_lines)
 
 
 def Config() -> ServerSettings:
@@ -512,9 +881,22 @@ def GetServerPort() -> int:
 
     try:
 
-        # 設定ファイルからサーバー設定をロードし、ポート番号だけを返す
+        # config.yaml を1行ずつ走査し、server セクション内の port の値を探す
+        ## YAML パーサーを使わずに済むため、config.yaml をロードするよりも高速に取得できる
+        current_parent_key = ''
         with open(_CONFIG_YAML_PATH, encoding='utf-8') as file:
-            config_dict: dict[str, dict[str, Any]] = dict(ruamel.yaml.YAML().load(file))
+            for line in file:
+                parent_key_match = _PARENT_KEY_PATTERN.match(line)
+                if parent_key_match is not None:
+                    current_parent_key = parent_key_match['key'].translate(_QUOTE_STRIP_TABLE)
+                elif current_parent_key == 'server':
+                    port_match = _PORT_PATTERN.match(line)
+                    if port_match is not None:
+                        return int(port_match['port'])
+
+        # 見つからなかった場合 (config.yaml の書式が config.example.yaml と異なる場合など) は、
+        # 設定ファイルからサーバー設定をロードし、ポート番号だけを返す
+        config_dict: dict[str, dict[str, Any]] = dict(_LoadConfigYAML())
         return config_dict['server']['port']
 
     # 処理中にエラーが発生した (config.yaml が存在しない・フォーマットが不正など) 場合は、デフォルトのポート番号を返す
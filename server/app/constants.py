@@ -23,6 +23,8 @@ ACCOUNT_ICON_DIR = DATA_DIR / 'account-icons'
 THUMBNAIL_DIR = DATA_DIR / 'thumbnails'
 ## サーバー終了時に再起動が必要なことを伝えるロックファイルのパス
 RESTART_REQUIRED_LOCK_PATH = DATA_DIR / 'restart_required.lock'
+## 起動高速化のためのキャッシュファイルがあるディレクトリ
+CACHE_DIR = DATA_DIR / 'cache'
 
 # スタティックディレクトリ
 STATIC_DIR = BASE_DIR / 'static'
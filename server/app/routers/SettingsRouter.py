@@ -2,15 +2,18 @@
 from fastapi import APIRouter
 from fastapi import Body
 from fastapi import Depends
+from fastapi import HTTPException
 from fastapi import status
 
 from app.config import ClientSettings
 from app.config import Config
+from app.config import ProbeServerSettings
 from app.config import SaveConfig
 from app.config import ServerSettings
 from app.models import User
 from app.routers.UsersRouter import GetCurrentAdminUser
 from app.routers.UsersRouter import GetCurrentUser
+from app.utils import Logging
 
 
 # ルーター
@@ -89,10 +92,24 @@ async def ServerSettingsUpdateAPI(
     """
     現在稼働中の KonomiTV サーバーのサーバー設定を更新する。<br>
     Docker 環境では、パス指定の項目には Docker 環境向けの Prefix (/host-rootfs) を付与した状態でリクエストする必要がある。<br>
-    Pydantic のカスタムバリデーターの実装の都合上、バリデーション処理中はメインスレッドが数秒間ブロッキングされることがあるので注意。<br>
+    バックエンドへの接続確認とエンコーダーの動作確認は、バリデーション後に非同期で並列に実行される。<br>
+    バックエンドに接続できなかったり、エンコーダーが利用できなかったりした場合は 422 エラーを返す。<br>
 
     JWT エンコードされたアクセストークンがリクエストの Authorization: Bearer に設定されていて、かつ管理者アカウントでないとアクセスできない。
     """
 
+    # バックエンドへの接続確認とエンコーダーの動作確認を行う
+    ## Pydantic のバリデーションでは設定内容の形式のみをチェックしているため、ここで実際に利用できるかを確認する
+    error_messages = await ProbeServerSettings(server_settings)
+    if len(error_messages) > 0:
+        Logging.error('[SettingsRouter][ServerSettingsUpdateAPI] Backend or encoder is not available.')
+        for error_message in error_messages:
+            for message in error_message.split('\n'):
+                Logging.error(f'[SettingsRouter][ServerSettingsUpdateAPI] {message}')
+        raise HTTPException(
+            status_code = status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail = 'Backend or encoder is not available',
+        )
+
     # バリデーションが完了したサーバー設定を config.yaml に保存する
     SaveConfig(server_settings)
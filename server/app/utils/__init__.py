@@ -4,15 +4,18 @@ from .Jikkyo import Jikkyo  # type: ignore
 from .OAuthCallbackResponse import OAuthCallbackResponse  # type: ignore
 from .TSInformation import TSInformation  # type: ignore
 
+import functools
 import platform
 import sys
 from pathlib import Path
 from typing import Literal
 
 
+@functools.cache
 def GetPlatformEnvironment() -> Literal['Windows', 'Linux', 'Linux-Docker', 'Linux-ARM'] | None:
     """
     サーバーが稼働している動作環境を取得する
+    動作環境はプロセスの実行中に変わることはないため、結果はキャッシュされる
 
     Returns:
         Literal['Windows', 'Linux', 'Linux-Docker', 'Linux-ARM'] | None: 動作環境を表す文字列 (サポート対象外の場合は None)